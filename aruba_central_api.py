@@ -1,10 +1,21 @@
 import os
 import sys
-import json
+import orjson
 import requests
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
+# Parse .env once at import; every client instance shares these values.
+load_dotenv()
+ARUBA_BASE_URL = os.getenv("ARUBA_BASE_URL")
+ARUBA_CLIENT_ID = os.getenv("ARUBA_CLIENT_ID")
+ARUBA_CLIENT_SECRET = os.getenv("ARUBA_CLIENT_SECRET")
+ARUBA_GROUP_NAME = os.getenv("ARUBA_GROUP_NAME")
+
 class ArubaCentralAPI:
     """A class to interact with the Aruba Central API."""
 
@@ -13,12 +24,25 @@ class ArubaCentralAPI:
         Initializes the API client and handles authentication.
         Prioritizes group_name passed as argument over environment variable.
         """
-        load_dotenv()
-        self.base_url = os.getenv("ARUBA_BASE_URL")
-        self.client_id = os.getenv("ARUBA_CLIENT_ID")
-        self.client_secret = os.getenv("ARUBA_CLIENT_SECRET")
-        self.group_name = group_name or os.getenv("ARUBA_GROUP_NAME")
+        self.base_url = ARUBA_BASE_URL
+        self.client_id = ARUBA_CLIENT_ID
+        self.client_secret = ARUBA_CLIENT_SECRET
+        self.group_name = group_name or ARUBA_GROUP_NAME
+        self._encoded_group = requests.utils.quote(self.group_name) if self.group_name else None
+        if self._encoded_group:
+            self._group_config_endpoint = f"/caasapi/v1/showcommand/object/effective?group_name={self._encoded_group}"
+            # The API endpoint requires the MAC address to be appended to the group name
+            self._device_config_endpoint_prefix = f"/caasapi/v1/showcommand/object/committed?group_name={self._encoded_group}/"
         self.token_file = 'token.json'
+
+        # Reuse one pooled keep-alive session for token and API calls.
+        self._session = requests.Session()
+        self._token_lock = threading.Lock()
+        # raise_on_status=False lets an exhausted retry fall through to raise_for_status().
+        retries = Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504], raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retries)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
         
         # Try to get a token, but don't exit if it fails immediately.
         self.access_token = self._get_access_token()
@@ -67,9 +91,9 @@ class ArubaCentralAPI:
     def _load_token_data(self):
         """Loads token data from the JSON file."""
         try:
-            with open(self.token_file, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
+            with open(self.token_file, 'rb') as f:
+                return orjson.loads(f.read())
+        except (FileNotFoundError, orjson.JSONDecodeError):
             return {}
 
     def _save_token_data(self, token_response):
@@ -81,8 +105,8 @@ class ArubaCentralAPI:
             "client_id": self.client_id,
             "client_secret": self.client_secret
         }
-        with open(self.token_file, 'w') as f:
-            json.dump(data_to_save, f)
+        with open(self.token_file, 'wb') as f:
+            f.write(orjson.dumps(data_to_save))
 
     def _refresh_token(self, refresh_token):
         """Refreshes the access token using a refresh token."""
@@ -96,12 +120,12 @@ class ArubaCentralAPI:
             payload['client_secret'] = self.client_secret
 
         try:
-            response = requests.post(url, data=payload)
+            response = self._session.post(url, data=payload)
             response.raise_for_status()
-            token_response = response.json()
+            token_response = orjson.loads(response.content)
             self._save_token_data(token_response)
             return token_response.get("access_token")
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
             print(f"Error refreshing token: {e}", file=sys.stderr)
             return self._authenticate_new_token()
 
@@ -114,32 +138,56 @@ class ArubaCentralAPI:
             'client_secret': self.client_secret
         }
         try:
-            response = requests.post(url, data=payload)
+            response = self._session.post(url, data=payload)
             response.raise_for_status()
-            token_response = response.json()
+            token_response = orjson.loads(response.content)
             self._save_token_data(token_response)
             return token_response.get("access_token")
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
             print(f"Error authenticating: {e}", file=sys.stderr)
             return None
 
-    def call_api(self, endpoint):
-        """Makes an authenticated API call."""
+    def _renew_access_token(self, stale_token):
+        """
+        Replaces a rejected access token, refreshing it if possible and
+        re-authenticating otherwise. Returns the new token or None.
+        """
+        with self._token_lock:
+            # Another thread may already have renewed the token.
+            if self.access_token != stale_token:
+                return self.access_token
+            refresh_token = self._load_token_data().get("refresh_token")
+            if refresh_token:
+                self.access_token = self._refresh_token(refresh_token)
+            else:
+                self.access_token = self._authenticate_new_token()
+            return self.access_token
+
+    def call_api(self, endpoint, _retried=False):
+        """
+        Makes an authenticated API call.
+        On a 401 the access token is renewed and the call is retried once.
+        """
         if not self.access_token:
             print("Error: No valid access token. Cannot make API call.", file=sys.stderr)
             return None
             
-        headers = {'Authorization': f'Bearer {self.access_token}'}
         url = f"{self.base_url}{endpoint}"
+        access_token = self.access_token
         try:
-            response = requests.get(url, headers=headers)
+            # Sent per request so the bearer token never reaches the /oauth2/token calls.
+            response = self._session.get(url, headers={'Authorization': f'Bearer {access_token}'})
             response.raise_for_status()
-            return response.json()
+            return orjson.loads(response.content)
         except requests.exceptions.HTTPError as e:
+            if e.response.status_code == 401 and not _retried:
+                print("Access token rejected, renewing and retrying...", file=sys.stderr)
+                if self._renew_access_token(access_token):
+                    return self.call_api(endpoint, _retried=True)
             print(f"HTTP Error calling API endpoint {endpoint}: {e.response.status_code} {e.response.text}", file=sys.stderr)
         except requests.exceptions.RequestException as e:
             print(f"Request Error calling API endpoint {endpoint}: {e}", file=sys.stderr)
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             print(f"Error: Could not decode JSON response from endpoint {endpoint}", file=sys.stderr)
         return None
 
@@ -148,9 +196,7 @@ class ArubaCentralAPI:
         if not self.group_name:
             print("Error: Cannot get group-level config without a group name.", file=sys.stderr)
             return None
-        encoded_group = requests.utils.quote(self.group_name)
-        endpoint = f"/caasapi/v1/showcommand/object/effective?group_name={encoded_group}"
-        return self.call_api(endpoint)
+        return self.call_api(self._group_config_endpoint)
 
     def get_device_override_config(self, mac_address):
         """Get the configuration for a specific device's local override."""
@@ -158,10 +204,19 @@ class ArubaCentralAPI:
             print("Error: Cannot get device config without a group name.", file=sys.stderr)
             return None
         
-        encoded_group = requests.utils.quote(self.group_name)
-        # The API endpoint requires the MAC address to be appended to the group name
-        combined_name = f"{encoded_group}/{mac_address}"
-        endpoint = f"/caasapi/v1/showcommand/object/committed?group_name={combined_name}"
-        return self.call_api(endpoint)
+        return self.call_api(self._device_config_endpoint_prefix + mac_address)
 
+    def get_device_override_configs(self, mac_addresses, max_workers=8):
+        """
+        Get the local override configuration for several devices concurrently.
+        Returns a dict mapping each MAC address to its config (or None on failure).
+        """
+        if not self.group_name:
+            print("Error: Cannot get device config without a group name.", file=sys.stderr)
+            return None
 
+        mac_addresses = list(mac_addresses)
+        # Bounded to the session pool size to stay under Aruba Central rate limits.
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            configs = executor.map(self.get_device_override_config, mac_addresses)
+            return dict(zip(mac_addresses, configs))
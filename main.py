@@ -1,14 +1,18 @@
 import argparse
-import json
+import orjson
 import sys
 import re
-import difflib
+import itertools
 import os
 import fnmatch
-from aruba_central_api import ArubaCentralAPI
+import mmap
+import stat
 
 __version__ = "0.1-alpha"
 
+_GLOB_CHARS = re.compile(r'[*?\[]')
+_MAC_RE = re.compile(r'^(?:[0-9a-fA-F]{2}[:\-]?){5}[0-9a-fA-F]{2}$|^[0-9a-fA-F]{12}$')
+
 # ANSI color codes for pretty printing
 class Colors:
     GREEN = '\033[92m'
@@ -17,62 +21,144 @@ class Colors:
     BOLD = '\033[1m'
     ENDC = '\033[0m'
 
+def compile_exemption_rules(exemption_rules):
+    """
+    Precompiles exemption rules into an (exact_rules, pattern_rules) pair.
+    Block patterns without wildcards go into exact_rules, a dict mapping the
+    header to (index, rules), so they cost a single dict lookup per header.
+    The remaining patterns are translated to regexes once and kept in file
+    order as (index, block matcher, rules) in pattern_rules; the index
+    preserves the first-match-wins order across both collections.
+    The rules are "*" for a fully exempt block, otherwise a single matcher
+    combining all of the block's line patterns (None if there are none).
+    """
+    exact_rules = {}
+    pattern_rules = []
+    if not isinstance(exemption_rules, dict):
+        return exact_rules, pattern_rules
+    line_matchers = {}  # Blocks with identical line patterns share one regex
+    for index, (block_pattern, rules) in enumerate(exemption_rules.items()):
+        if isinstance(rules, list) and rules:
+            key = tuple(rules)
+            if key not in line_matchers:
+                combined = '|'.join(f"(?:{fnmatch.translate(line_pattern)})" for line_pattern in rules)
+                line_matchers[key] = re.compile(combined).match
+            rules = line_matchers[key]
+        elif rules != "*":
+            rules = None
+        if _GLOB_CHARS.search(block_pattern):
+            pattern_rules.append((index, re.compile(fnmatch.translate(block_pattern)).match, rules))
+        else:
+            exact_rules.setdefault(block_pattern, (index, rules))
+    return exact_rules, pattern_rules
+
+def _find_block_rules(header, exact_rules, pattern_rules):
+    """Returns the compiled rules of the first exemption matching a block header, or None."""
+    exact_match = exact_rules.get(header)
+    for index, block_match, rules in pattern_rules:
+        if exact_match is not None and index > exact_match[0]:
+            break  # The exact rule comes first in the file
+        if block_match(header):
+            return rules
+    return exact_match[1] if exact_match is not None else None
+
 def apply_exemptions(config_list, exemption_rules):
     """
     Parses a list of config lines and removes items based on exemption rules.
     - If a block header pattern has a value of "*", the entire block is removed.
     - If a block header pattern has a list of line patterns, only those lines
       within the block are removed. Supports wildcards.
+    Accepts either the raw rules dict or the output of compile_exemption_rules.
     """
-    if not isinstance(config_list, list) or not isinstance(exemption_rules, dict):
+    if isinstance(exemption_rules, dict):
+        exemption_rules = compile_exemption_rules(exemption_rules)
+    if not isinstance(config_list, list) or not isinstance(exemption_rules, tuple):
         return config_list
+    exact_rules, pattern_rules = exemption_rules
+    if not exact_rules and not pattern_rules:
+        return list(config_list)  # Nothing can ever be exempted
 
     filtered_config = []
+    append = filtered_config.append  # Bound once; called for nearly every line
     in_fully_exempt_block = False
-    current_line_exemptions = []
+    current_line_match = None
 
     for line in config_list:
         # If we are inside a block that should be fully ignored
         if in_fully_exempt_block:
-            if line.strip() == "!":
+            # Cheap containment test first; only candidate lines get stripped
+            if "!" in line and line.strip() == "!":
                 in_fully_exempt_block = False
             continue  # Skip this line
 
         # Check if the current line is a block header (no leading whitespace)
-        is_header = not line.startswith(' ')
+        is_header = line[:1] != ' '
         if is_header:
             # We've started a new block, so reset the line-level exemptions
-            current_line_exemptions = []
+            current_line_match = None
             # Check if this new block matches any exemption rule
-            for block_pattern, rules in exemption_rules.items():
-                if fnmatch.fnmatch(line, block_pattern):
-                    if rules == "*":
-                        # This block should be fully exempted.
-                        in_fully_exempt_block = True
-                    elif isinstance(rules, list):
-                        # This block has specific line exemptions.
-                        current_line_exemptions = rules
-                    break  # Found the matching rule for this block, no need to check others
+            rules = _find_block_rules(line, exact_rules, pattern_rules)
+            if rules == "*":
+                # This block should be fully exempted.
+                in_fully_exempt_block = True
+            else:
+                # This block has specific line exemptions (or none).
+                current_line_match = rules
             
             if in_fully_exempt_block:
                 continue # Skip the header line of the fully exempt block
 
         # Now, check if the current line should be exempted based on line-level rules
-        is_line_exempt = False
-        if current_line_exemptions:
-            for line_pattern in current_line_exemptions:
-                if fnmatch.fnmatch(line.strip(), line_pattern):
-                    is_line_exempt = True
-                    break
-        
-        if is_line_exempt:
-            continue # Skip this specific line
+        if current_line_match is not None:
+            if not current_line_match(line.strip()):
+                append(line)
+            continue # Either exempted or already kept
 
         # If the line has survived all checks, add it to the final config
-        filtered_config.append(line)
+        append(line)
 
     return filtered_config
 
+_MISSING = object()
+
+def _iter_differences(config_a, config_b, path=''):
+    """
+    Walks two parsed configurations and yields (path, old, new) for every
+    differing subtree. Equal subtrees are skipped without descending; lists
+    and scalars are treated as leaves. Missing keys are yielded as _MISSING.
+    Paths use JSON-quoted brackets, e.g. ["config"] or ["a.b"]["c"].
+    """
+    if config_a == config_b:
+        return
+    if isinstance(config_a, dict) and isinstance(config_b, dict):
+        for key in sorted(config_a.keys() | config_b.keys()):
+            yield from _iter_differences(
+                config_a.get(key, _MISSING),
+                config_b.get(key, _MISSING),
+                f"{path}[{orjson.dumps(key).decode()}]"
+            )
+    else:
+        yield path, config_a, config_b
+
+def load_json_file(path):
+    """
+    Parses a JSON file. Non-empty regular files are memory-mapped so orjson
+    reads straight from the page cache without first copying the file into
+    a bytes object; pipes, /dev/stdin and empty files are read normally.
+    """
+    with open(path, 'rb') as f:
+        file_stat = os.fstat(f.fileno())
+        if not stat.S_ISREG(file_stat.st_mode) or file_stat.st_size == 0:
+            return orjson.loads(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            return orjson.loads(view)
+
+def _dump_lines(value):
+    """Serializes a config subtree to indented JSON lines for diffing."""
+    if value is _MISSING:
+        return []
+    return orjson.dumps(value, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS).decode().splitlines()
+
 def compare_configs(config_a, config_b, simplified=False, from_file='template.json', to_file='live_config.json'):
     """
     Compares two configurations and prints the differences with colors.
@@ -84,24 +170,49 @@ def compare_configs(config_a, config_b, simplified=False, from_file='template.js
 
     print(f"{Colors.RED}❌ Configurations do not match.{Colors.ENDC}")
     
-    config_a_str = json.dumps(config_a, indent=2, sort_keys=True).splitlines()
-    config_b_str = json.dumps(config_b, indent=2, sort_keys=True).splitlines()
-    diff = list(difflib.unified_diff(config_a_str, config_b_str, fromfile=from_file, tofile=to_file, lineterm=''))
-    
-    additions = sum(1 for line in diff if line.startswith('+') and not line.startswith('+++'))
-    removals = sum(1 for line in diff if line.startswith('-') and not line.startswith('---'))
+    import difflib  # Deferred: only needed when there is something to diff
+
+    # Only the differing subtrees are serialized and diffed.
+    diff = itertools.chain.from_iterable(
+        difflib.unified_diff(
+            _dump_lines(old), _dump_lines(new),
+            fromfile=f"{from_file}:{path}" if path else from_file,
+            tofile=f"{to_file}:{path}" if path else to_file,
+            lineterm=''
+        )
+        for path, old, new in _iter_differences(config_a, config_b)
+    )
 
+    # Count and print in a single pass over the diff generator. Output is
+    # buffered and written in chunks rather than one print() per line.
+    green, red, cyan, endc = Colors.GREEN, Colors.RED, Colors.CYAN, Colors.ENDC
+    write = sys.stdout.write
+    buffer = None if simplified else []
+    additions = 0
+    removals = 0
     if not simplified:
-        print(f"{Colors.CYAN}List of detailed differences:{Colors.ENDC}")
-        for line in diff:
-            if line.startswith('+'):
-                print(f"{Colors.GREEN}{line}{Colors.ENDC}")
-            elif line.startswith('-'):
-                print(f"{Colors.RED}{line}{Colors.ENDC}")
-            elif line.startswith('@@'):
-                print(f"{Colors.CYAN}{line}{Colors.ENDC}")
-            else:
-                print(line)
+        print(f"{cyan}List of detailed differences:{endc}")
+    for line in diff:
+        prefix = line[:1]
+        if prefix == '+':
+            if not line.startswith('+++'):
+                additions += 1
+            color = green
+        elif prefix == '-':
+            if not line.startswith('---'):
+                removals += 1
+            color = red
+        elif line.startswith('@@'):
+            color = cyan
+        else:
+            color = ''
+        if buffer is not None:
+            buffer.append(f"{color}{line}{endc}\n" if color else f"{line}\n")
+            if len(buffer) >= 1000:
+                write(''.join(buffer))
+                buffer.clear()
+    if buffer:
+        write(''.join(buffer))
     
     print("\n" + "="*40)
     print(f"{Colors.BOLD}Summary of differences:{Colors.ENDC}")
@@ -113,12 +224,27 @@ def compare_configs(config_a, config_b, simplified=False, from_file='template.js
 
 def validate_mac_address(mac):
     """Custom argparse type for validating a MAC address."""
-    if not re.match(r'^([0-9a-fA-F]{2}([:\-]?)){5}[0-9a-fA-F]{2}$|^[0-9a-fA-F]{12}$', mac):
+    if not _MAC_RE.match(mac):
         raise argparse.ArgumentTypeError(f"'{mac}' is not a valid MAC address format.")
     return mac
 
+def fetch_live_config(group_name=None, mac_address=None):
+    """Fetches the live group config, or a device's override config if a MAC is given."""
+    # Deferred so --help and argument errors don't pay for requests/dotenv imports.
+    from aruba_central_api import ArubaCentralAPI
+
+    api = ArubaCentralAPI(group_name=group_name)
+    if mac_address:
+        return api.get_device_override_config(mac_address)
+    return api.get_group_level_config()
+
 def main():
     """Main function to run the configuration comparison."""
+    # Answer --version before building the parser or importing the API client.
+    if sys.argv[1:2] == ['--version']:
+        print(f"{os.path.basename(sys.argv[0])} {__version__}")
+        sys.exit(0)
+
     parser = argparse.ArgumentParser(
         description="Compare Aruba Central configuration against a template or a previous snapshot.",
         formatter_class=argparse.RawTextHelpFormatter
@@ -151,28 +277,21 @@ def main():
     if args.previous_config:
         from_filename = args.previous_config
         try:
-            with open(args.previous_config, 'r') as f:
-                config_to_compare = json.load(f)
+            config_to_compare = load_json_file(args.previous_config)
             print(f"Loaded previous configuration from '{args.previous_config}' for comparison.")
-        except (FileNotFoundError, json.JSONDecodeError) as e:
+        except (FileNotFoundError, orjson.JSONDecodeError) as e:
             print(f"Error loading previous config '{args.previous_config}': {e}", file=sys.stderr)
             sys.exit(1)
     else:
         if not args.save_config or args.previous_config:
             try:
-                with open(args.template, 'r') as f:
-                    config_to_compare = json.load(f)
-            except (FileNotFoundError, json.JSONDecodeError) as e:
+                config_to_compare = load_json_file(args.template)
+            except (FileNotFoundError, orjson.JSONDecodeError) as e:
                 print(f"Error loading template '{args.template}': {e}", file=sys.stderr)
                 sys.exit(1)
 
     try:
-        api = ArubaCentralAPI(group_name=args.group_name)
-        live_config = None
-        if args.mac_address:
-            live_config = api.get_device_override_config(args.mac_address)
-        else:
-            live_config = api.get_group_level_config()
+        live_config = fetch_live_config(args.group_name, args.mac_address)
 
         if live_config is None:
             print("\nError: Failed to fetch the live configuration from Aruba Central.", file=sys.stderr)
@@ -181,8 +300,8 @@ def main():
         # If an exemption file is provided, apply the rules
         if args.exemptions:
             try:
-                with open(args.exemptions, 'r') as f:
-                    exemption_rules = json.load(f)
+                with open(args.exemptions, 'rb') as f:
+                    exemption_rules = compile_exemption_rules(orjson.loads(f.read()))
                 print(f"Applying exemption rules from '{args.exemptions}'...")
                 
                 if config_to_compare and 'config' in config_to_compare:
@@ -191,14 +310,14 @@ def main():
                 if 'config' in live_config:
                     live_config['config'] = apply_exemptions(live_config['config'], exemption_rules)
 
-            except (FileNotFoundError, json.JSONDecodeError) as e:
+            except (FileNotFoundError, orjson.JSONDecodeError) as e:
                 print(f"Error loading exemption file '{args.exemptions}': {e}", file=sys.stderr)
                 sys.exit(1)
 
         if args.save_config:
             try:
-                with open(args.save_config, 'w') as f:
-                    json.dump(live_config, f, indent=2, sort_keys=True)
+                with open(args.save_config, 'wb') as f:
+                    f.write(orjson.dumps(live_config, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS))
                 print(f"Successfully saved live configuration to '{args.save_config}'")
                 if not args.previous_config and not os.path.exists(args.template):
                     sys.exit(0)